@@ -10,29 +10,30 @@ import os
 from pathlib import Path
 
 
-def get_file_size(filepath) -> int:
+def get_file_size(filepath, dir_fd: int | None = None) -> int:
     """
     Get the size of a file in bytes.
 
     Args:
         filepath (str): The path to the file.
+        dir_fd (int | None): An open directory descriptor that relative paths are resolved against.
 
     Returns:
         int: The size of the file in bytes. Returns 0 if there is an error.
     """
     try:
-        return os.path.getsize(filepath)
+        return os.stat(filepath, dir_fd=dir_fd).st_size
     except OSError as e:
         print(f"Error getting file size for {filepath}: {e}")
         return 0
 
 
-def get_remaining_space(filepath: Path) -> int:
+def get_remaining_space(filepath: Path | int) -> int:
     """
     Get the remaining free space on the file system containing the given path.
 
     Args:
-        filepath (Path): The path to the directory.
+        filepath (Path | int): The path to the directory, or an open descriptor for it.
 
     Returns:
         int: The remaining free space in bytes.
@@ -58,6 +59,34 @@ def get_boot_dir_path() -> Path:
     return boot_dir
 
 
+def get_kernel_sizes(boot_fd: int) -> dict[str, int]:
+    """
+    Get the combined size of each kernel and its initramfs in the boot directory.
+
+    Args:
+        boot_fd (int): An open descriptor for the boot directory.
+
+    Returns:
+        dict[str, int]: A mapping of kernel version to kernel plus initramfs size in bytes.
+    """
+    kernel_sizes = {}
+
+    # Stat relative to the open /boot descriptor so each lookup skips the full path walk
+    file_names = set(os.listdir(boot_fd))
+    for file_name in file_names:
+        if not file_name.startswith("kernel-"):
+            continue
+
+        kernel_version = file_name[len("kernel-") :]
+        kernel_size = get_file_size(file_name, dir_fd=boot_fd)
+        initramfs_name = f"initramfs-{kernel_version}.img"
+        if initramfs_name in file_names:
+            kernel_size += get_file_size(initramfs_name, dir_fd=boot_fd)
+        kernel_sizes[kernel_version] = kernel_size
+
+    return kernel_sizes
+
+
 def humanize_size(size_bytes: int) -> str:
     """
     Convert a size in bytes to a human-readable string with appropriate units.
@@ -87,17 +116,16 @@ def main():
     """
     boot_dir = get_boot_dir_path()
 
-    remaining_space = get_remaining_space(boot_dir)
-    kernel_files = list(boot_dir.glob("kernel-*"))
-    num_kernels = len(kernel_files)
-    total_kernel_size = 0
-
-    for kernel_file in kernel_files:
-        total_kernel_size += get_file_size(kernel_file)
-        kernel_version = kernel_file.name[len("kernel-") :]
-        initramfs_file = boot_dir / f"initramfs-{kernel_version}.img"
-        if initramfs_file.exists():
-            total_kernel_size += get_file_size(initramfs_file)
+    # Open /boot once and reuse the descriptor for every statvfs/stat/listdir call
+    boot_fd = os.open(boot_dir, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        remaining_space = get_remaining_space(boot_fd)
+        kernel_sizes = get_kernel_sizes(boot_fd)
+    finally:
+        os.close(boot_fd)
+
+    num_kernels = len(kernel_sizes)
+    total_kernel_size = sum(kernel_sizes.values())
 
     if num_kernels == 0:
         raise FileNotFoundError("No kernel files found in the '/boot' directory.")
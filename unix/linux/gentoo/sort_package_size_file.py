@@ -1,5 +1,21 @@
 #!/usr/bin/env python3
 import argparse
+import heapq
+import re
+
+# Matches a line of `qsize -b -C -q` output, e.g.
+# "app-arch/bzip2-1.0.8-r5: 41 files (40 unique), 19 non-files, 562358 bytes"
+PACKAGE_LINE_PATTERN = re.compile(
+    r"""
+    (?P<package>\S+)[ \t]+
+    (?P<files>\d+)[ \t]+files
+    (?:[ \t]+\((?P<unique>\d+)[ \t]+unique\))?,?[ \t]+
+    (?P<nonfiles>\d+)[ \t]+non-files,?[ \t]+
+    (?P<size>\d+)[ \t]+(?P<unit>\S+)
+    [ \t]*
+    """,
+    re.VERBOSE,
+)
 
 
 def get_args():
@@ -76,14 +92,19 @@ def sort_lines(options, package_info):
 
     key_function = lambda sublist: int(sublist[sort_key_indices[sort_by]][0])
 
-    sorted_packages = sorted(
-        package_info,
-        key=key_function,
-    )
+    if options.limit_display_to > 0:
+        # Only the top packages are needed, so a bounded heap beats a full sort
+        choose_packages = heapq.nlargest if options.greatest else heapq.nsmallest
+        sorted_packages = choose_packages(
+            options.limit_display_to, package_info, key=key_function
+        )
+    else:
+        sorted_packages = sorted(
+            package_info,
+            key=key_function,
+            reverse=options.greatest,
+        )
 
-    if options.limit_display_to and not 0:
-        sorted_packages = sorted_packages[0 : options.limit_display_to]
-    
     humanize_all_sizes(sorted_packages)
 
     return sorted_packages
@@ -112,21 +133,19 @@ def read_lines():
     with open("test.txt", "r", encoding="utf-8") as file:
         lines = []
         for line in file:
-            fields = line.strip(",").split()
-            package = fields[0]
-
-            files = (fields[1], " files")
-
-            if "unique" in line:
-                unique_files = (fields[3].strip("()"), " unique files")
-                non_files = (fields[5], " non-files")
-                size = (fields[7], fields[8])
-            else:
-                non_files = (fields[3], " non-files")
-                unique_files = (0, " unique files")
-                size = (fields[5], fields[6])
-
-            lines.append([package, files, unique_files, non_files, size])
+            match = PACKAGE_LINE_PATTERN.fullmatch(line.rstrip("\n"))
+            if match is None:
+                raise ValueError(f"Unrecognized package size line: {line!r}")
+
+            lines.append(
+                [
+                    match["package"],
+                    (match["files"], " files"),
+                    (match["unique"] or 0, " unique files"),
+                    (match["nonfiles"], " non-files"),
+                    (match["size"], match["unit"]),
+                ]
+            )
 
         return lines
 
@@ -1,6 +1,8 @@
 import argparse
+import functools
 import logging
 import os
+import re
 import subprocess
 import tempfile
 from pathlib import Path
@@ -36,14 +38,100 @@ class H264EncodingError(EncodingError):
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
+log = logging.getLogger(__name__)
+
+# Invariant parts of the ffmpeg command lines, only the per-call values get spliced in.
+# -hide_banner/-nostats stop ffmpeg writing the banner and per-frame progress to stderr.
+_FFMPEG_BASE_ARGS: tuple[str, ...] = ("ffmpeg", "-hide_banner", "-nostats")
+
+# fmt: off
+_VP9_ARGS: tuple[str, ...] = (
+    "-c:v", "vp9",
+    "-r", "30",
+    "-b:v", "400k",
+    "-minrate", "200k",
+    "-maxrate", "600k",
+    "-crf", "32",
+    "-map_metadata", "-1",
+    "-quality", "good",
+    "-an",
+)
+
+_VP9_VAAPI_ARGS: tuple[str, ...] = (
+    "-c:v", "vp9_vaapi",
+    "-r", "30",
+    "-b:v", "400k",
+    "-maxrate", "600k",
+    "-map_metadata", "-1",
+    "-an",
+)
+
+# H264 encoders in order of preference, hardware first with libx264 as the fallback.
+_H264_ENCODER_ARGS: dict[str, tuple[str, ...]] = {
+    "h264_nvenc": ("-c:v", "h264_nvenc", "-preset", "p5", "-tune", "hq", "-rc", "vbr", "-cq", "19"),
+    "h264_qsv": ("-c:v", "h264_qsv", "-preset", "veryslow", "-global_quality", "23"),
+    "h264_vaapi": ("-c:v", "h264_vaapi", "-qp", "23"),
+    "libx264": ("-c:v", "libx264", "-crf", "23", "-preset", "veryslow", "-tune", "fastdecode"),
+}
+
+_H264_ARGS: tuple[str, ...] = (
+    "-r", "30",
+    "-profile:v", "high",
+    "-movflags", "+faststart",
+    "-map_metadata", "-1",
+    "-an",
+)
+# fmt: on
 
+_VAAPI_DEVICE = "/dev/dri/renderD128"
+_HW_ENCODERS = frozenset({"h264_nvenc", "h264_qsv", "h264_vaapi", "vp9_vaapi"})
+# Matches the encoder name on the video encoder lines of `ffmpeg -encoders`,
+# e.g. " V....D h264_nvenc  NVIDIA ..."
+_VIDEO_ENCODER_PATTERN = re.compile(r"^\s*V\S*\s+(\S+)", re.MULTILINE)
 
-def build_downscaling_filter(width: int, height: int | None = -1):
+
+@functools.cache
+def build_downscaling_filter(width: int, height: int | None = -1, vaapi: bool = False):
     """Build the FFmpeg filter for down scaling video, height defaults to -1, which uses the aspect ratio to figure it out."""
+    if vaapi:
+        # Upload the frames and scale on the GPU, VAAPI needs even dimensions so use -2
+        return (
+            f"format=nv12,hwupload,scale_vaapi={width}:{-2 if height == -1 else height}"
+        )
     return f"scale={width}:{height}:flags=lanczos+accurate_rnd+full_chroma_int+full_chroma_inp"
 
 
-def convert_video(input_file: Path, output_base: Path):
+@functools.cache
+def detect_hw_encoders() -> frozenset[str]:
+    """Detect the hardware encoders ffmpeg supports, empty if it can't be queried."""
+    try:
+        result = subprocess.run(
+            [*_FFMPEG_BASE_ARGS, "-encoders"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        log.warning("Could not query ffmpeg encoders, using software encoding: %s", e)
+        return frozenset()
+
+    hw_encoders = _HW_ENCODERS.intersection(
+        _VIDEO_ENCODER_PATTERN.findall(result.stdout)
+    )
+
+    # VAAPI encoders are useless without a render node to run them on
+    if not os.path.exists(_VAAPI_DEVICE):
+        hw_encoders = {
+            encoder for encoder in hw_encoders if not encoder.endswith("_vaapi")
+        }
+
+    log.info("Detected hardware encoders: %s", ", ".join(sorted(hw_encoders)) or "none")
+    return frozenset(hw_encoders)
+
+
+def convert_video(
+    input_file: Path, output_base: Path, hw_encoders: frozenset[str] = frozenset()
+):
     vp9_file = output_base.with_suffix(".webm")
     h264_file = output_base.with_suffix(".mp4")
 
@@ -51,21 +139,53 @@ def convert_video(input_file: Path, output_base: Path):
         # TODO: args for optional height and width changes
         downscale_filter = build_downscaling_filter(640)
 
-        # VP9 2-pass encoding
-        logging.info(f"Converting {input_file} to VP9 (WebM)...")
-        convert_video_vp9_two_pass(input_file, downscale_filter, vp9_file)
-
-        # H264 encoding
-        logging.info(f"Converting {input_file} to H264 (Mp4)...")
-        convert_video_h264(input_file, downscale_filter, h264_file)
+        # VP9 encoding, single pass on the GPU if possible otherwise 2-pass in software
+        if "vp9_vaapi" in hw_encoders:
+            log.info("Converting %s to VP9 (WebM) with vp9_vaapi...", input_file)
+            try:
+                convert_video_vp9_vaapi(
+                    input_file, build_downscaling_filter(640, vaapi=True), vp9_file
+                )
+            except VP9EncodingError:
+                log.warning("vp9_vaapi encoding failed, falling back to software VP9")
+                # ffmpeg creates the output before the encoder fails, remove it so
+                # the retry doesn't stop at the overwrite prompt
+                vp9_file.unlink(missing_ok=True)
+                convert_video_vp9_two_pass(input_file, downscale_filter, vp9_file)
+        else:
+            log.info("Converting %s to VP9 (WebM)...", input_file)
+            convert_video_vp9_two_pass(input_file, downscale_filter, vp9_file)
+
+        # H264 encoding, trying each detected hardware encoder before libx264 since
+        # ffmpeg lists encoders it was built with even if the hardware is missing
+        h264_encoders = [
+            encoder
+            for encoder in _H264_ENCODER_ARGS
+            if encoder in hw_encoders or encoder == "libx264"
+        ]
+        for h264_encoder in h264_encoders:
+            log.info("Converting %s to H264 (Mp4) with %s...", input_file, h264_encoder)
+            try:
+                convert_video_h264(
+                    input_file,
+                    build_downscaling_filter(640, vaapi=h264_encoder == "h264_vaapi"),
+                    h264_file,
+                    encoder=h264_encoder,
+                )
+                break
+            except H264EncodingError:
+                if h264_encoder == "libx264":
+                    raise
+                log.warning("%s encoding failed, trying the next encoder", h264_encoder)
+                h264_file.unlink(missing_ok=True)
 
         return vp9_file, h264_file
 
     except VP9EncodingError as e:
-        logging.error(f"VP9 encoding failed: {e}")
+        log.error("VP9 encoding failed: %s", e)
         raise
     except H264EncodingError as e:
-        logging.error(f"H264 encoding failed: {e}")
+        log.error("H264 encoding failed: %s", e)
         raise
 
 
@@ -80,20 +200,12 @@ def run_vp9_pass(
     try:
         # fmt: off
         cmd = [
-            "ffmpeg",
+            *_FFMPEG_BASE_ARGS,
             "-i", str(input_file),
             "-vf", downscale_filter,
-            "-c:v", "vp9",
-            "-r", "30",
-            "-b:v", "400k",
-            "-minrate", "200k",
-            "-maxrate", "600k",
-            "-crf", "32",
-            "-map_metadata", "-1",
-            "-quality", "good",
+            *_VP9_ARGS,
             "-speed", str(speed),
             "-pass", str(pass_num),
-            "-an",
         ]
         # fmt: on
 
@@ -102,10 +214,10 @@ def run_vp9_pass(
         elif output:
             cmd.append(str(output))
 
-        logging.info(f"Starting pass {pass_num} for {input_file}...")
+        log.info("Starting pass %d for %s...", pass_num, input_file)
         subprocess.run(cmd, check=True)
     except subprocess.CalledProcessError as e:
-        logging.error(f"Error during pass {pass_num} VP9 encoding: {e}")
+        log.error("Error during pass %d VP9 encoding: %s", pass_num, e)
         raise VP9EncodingError(f"Pass {pass_num} failed") from e
 
 
@@ -119,35 +231,52 @@ def convert_video_vp9_two_pass(
     # 2nd pass
     run_vp9_pass(input_file, downscale_filter, pass_num=2, speed=1, output=output_vp9)
 
-    logging.info(
-        f"2-pass VP9 encoding completed for {input_file}. Output: {output_vp9}"
-    )
+    log.info("2-pass VP9 encoding completed for %s. Output: %s", input_file, output_vp9)
 
 
-def convert_video_h264(input_file: Path, downscale_filter: str, output_h264: Path):
-    """Performs h264 encoding."""
+def convert_video_vp9_vaapi(input_file: Path, downscale_filter: str, output_vp9: Path):
+    """Performs single pass VP9 encoding on the GPU with VAAPI."""
     try:
         # fmt: off
         cmd = [
-            "ffmpeg",
+            *_FFMPEG_BASE_ARGS,
+            "-vaapi_device", _VAAPI_DEVICE,
             "-i", str(input_file),
             "-vf", downscale_filter,
-            "-c:v", "libx264",
-            "-crf", "23",
-            "-r", "30",
-            "-preset", "veryslow",
-            "-tune", "fastdecode",
-            "-profile:v", "high",
-            "-movflags", "+faststart",
-            "-map_metadata", "-1",
-            "-an",
-            str(output_h264),
+            *_VP9_VAAPI_ARGS,
+            str(output_vp9),
         ]
+        # fmt: on
+
+        subprocess.run(cmd, check=True)
+    except subprocess.CalledProcessError as e:
+        log.error("Error during vp9_vaapi encoding: %s", e)
+        raise VP9EncodingError(f"Encoding {input_file} to {output_vp9} failed") from e
+
+    log.info("VAAPI VP9 encoding completed for %s. Output: %s", input_file, output_vp9)
+
+
+def convert_video_h264(
+    input_file: Path, downscale_filter: str, output_h264: Path, encoder: str = "libx264"
+):
+    """Performs h264 encoding with the given encoder, defaults to software libx264."""
+    vaapi_args = ("-vaapi_device", _VAAPI_DEVICE) if encoder == "h264_vaapi" else ()
+    try:
         # fmt: off
+        cmd = [
+            *_FFMPEG_BASE_ARGS,
+            *vaapi_args,
+            "-i", str(input_file),
+            "-vf", downscale_filter,
+            *_H264_ENCODER_ARGS[encoder],
+            *_H264_ARGS,
+            str(output_h264),
+        ]
+        # fmt: on
 
         subprocess.run(cmd, check=True)
     except subprocess.CalledProcessError as e:
-        logging.error(f"Error during h264 encoding: {e}")
+        log.error("Error during h264 encoding: %s", e)
         raise H264EncodingError(f"Encoding {input_file} to {output_h264} failed") from e
 
 
@@ -155,11 +284,11 @@ def cleanup_temp_files(files: list[Path]):
     """Remove temporary files created during encoding"""
     for file in files:
         if file.exists():
-            logging.info(f"Cleaning up temporary file: {file}")
+            log.info("Cleaning up temporary file: %s", file)
             try:
                 file.unlink()
             except OSError as e:
-                logging.error(f"Error deleting {file}: {e}")
+                log.error("Error deleting %s: %s", file, e)
 
 
 def upload_file_to_imgix(file_path: Path, origin_path: str):
@@ -175,11 +304,12 @@ def upload_file_to_imgix(file_path: Path, origin_path: str):
         response = requests.post(url, headers=headers, data=file_data)
 
     if response.status_code == 200:
-        logging.info(f"File {file_path} uploaded successfully.")
-        logging.info(f"Asset URL: {response.json()['data']['attributes']['url']}")
+        log.info("File %s uploaded successfully.", file_path)
+        if log.isEnabledFor(logging.INFO):
+            log.info("Asset URL: %s", response.json()["data"]["attributes"]["url"])
     else:
-        logging.error(f"Failed to upload file: {response.status_code}")
-        logging.error(response.text)
+        log.error("Failed to upload file: %d", response.status_code)
+        log.error("%s", response.text)
 
 
 def main():
@@ -190,6 +320,12 @@ def main():
     parser.add_argument(
         "output_base", help="Base name for the output files (extensions will be added)"
     )
+    parser.add_argument(
+        "--hw",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Use hardware encoders (NVENC/QSV/VAAPI) when ffmpeg supports them",
+    )
 
     args = parser.parse_args()
 
@@ -199,7 +335,7 @@ def main():
     # Check to make sure input file exists
     if not input_file.exists():
         error_msg = f"Input file {input_file} does not exist."
-        logging.error(error_msg)
+        log.error(error_msg)
         raise ValueError(error_msg)
 
     # Get the basenames for upload to imgix
@@ -214,22 +350,24 @@ def main():
 
         try:
             # Convert video to VP9 and H264
+            hw_encoders = detect_hw_encoders() if args.hw else frozenset()
             output_vp9, output_h264 = convert_video(
-                input_file, temp_dir_path / output_base
+                input_file, temp_dir_path / output_base, hw_encoders
             )
 
             # Upload files
             upload_file_to_imgix(output_vp9, vp9_origin_path)
             upload_file_to_imgix(output_h264, h264_origin_path)
 
-        except Exception as e:
-            logging.error(f"An error occurred: {e}")
+        except EncodingError:
+            log.exception("Converting %s failed", input_file)
+            raise
 
         finally:
             # remove temp files
             cleanup_temp_files([output_vp9, output_h264])
 
-            logging.info(f"Temporary directory {temp_dir} cleaned up.")
+            log.info("Temporary directory %s cleaned up.", temp_dir)
 
 
 if __name__ == "__main__":